@@ -0,0 +1,184 @@
+/*
+ * _easyavi_rle.c
+ * Optional compiled MSRLE24 row encoder for easyavi.py.
+ * Build with: python setup.py build_ext --inplace
+ * Public domain.
+ *
+ * Mirrors the row encoding in easyavi.py (_row_rle_nb): rows of pixels
+ * packed as B | (G<<8) | (R<<16) in uint32 lanes are encoded into
+ * run/skip/absolute packets written to a preallocated byte buffer.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+
+/* emits absolute packets for pixels read..pos, returns new out_pos */
+static Py_ssize_t
+abs_rle(const uint32_t *ipix, Py_ssize_t read, Py_ssize_t pos,
+        uint8_t *out, Py_ssize_t out_pos)
+{
+	while (read < pos)
+	{
+		Py_ssize_t abslen = pos - read;
+		if (abslen < 3)
+		{
+			uint32_t p = ipix[read];
+			out[out_pos+0] = 1;
+			out[out_pos+1] = (uint8_t)(p      );
+			out[out_pos+2] = (uint8_t)(p >>  8);
+			out[out_pos+3] = (uint8_t)(p >> 16);
+			out_pos += 4;
+			read += 1;
+		}
+		else
+		{
+			Py_ssize_t target;
+			if (abslen > 255) abslen = 255;
+			out[out_pos+0] = 0;
+			out[out_pos+1] = (uint8_t)abslen;
+			out_pos += 2;
+			target = read + abslen;
+			while (read < target)
+			{
+				uint32_t p = ipix[read];
+				out[out_pos+0] = (uint8_t)(p      );
+				out[out_pos+1] = (uint8_t)(p >>  8);
+				out[out_pos+2] = (uint8_t)(p >> 16);
+				out_pos += 3;
+				read += 1;
+			}
+		}
+	}
+	return out_pos;
+}
+
+/* encodes one row, returns new out_pos */
+static Py_ssize_t
+row_rle_c(const uint32_t *ipix, const uint32_t *ppix, Py_ssize_t w,
+          uint8_t *out, Py_ssize_t out_pos)
+{
+	Py_ssize_t read = 0; /* pixels already encoded */
+	Py_ssize_t pos = 0; /* pixels currently investigated */
+	while (pos < w)
+	{
+		/* count consecutive delta pixels */
+		Py_ssize_t match = 0;
+		Py_ssize_t run;
+		Py_ssize_t i;
+		uint32_t p;
+		if (ppix != NULL)
+		{
+			i = pos;
+			while (i < w && ipix[i] == ppix[i]) ++i;
+			match = i - pos;
+		}
+		/* count consecutive matching pixels */
+		p = ipix[pos];
+		run = 1;
+		i = pos + 1;
+		while (i < w && ipix[i] == p) { ++run; ++i; }
+		if (run > 255) run = 255;
+		/* emit a match, run, or collect raw bytes for absolute encoding */
+		if ((run > match) && (run > 1))
+		{
+			out_pos = abs_rle(ipix, read, pos, out, out_pos);
+			out[out_pos+0] = (uint8_t)run;
+			out[out_pos+1] = (uint8_t)(p      );
+			out[out_pos+2] = (uint8_t)(p >>  8);
+			out[out_pos+3] = (uint8_t)(p >> 16);
+			out_pos += 4;
+			read = pos + run;
+			pos += run;
+		}
+		else if (match > 1)
+		{
+			out_pos = abs_rle(ipix, read, pos, out, out_pos);
+			read = pos;
+			if ((pos + match) >= w) break; /* immediate end of line */
+			if (match > 255) match = 255;
+			out[out_pos+0] = 0;
+			out[out_pos+1] = 2; /* skip command */
+			out[out_pos+2] = (uint8_t)match; /* X skip */
+			out[out_pos+3] = 0; /* Y skip */
+			out_pos += 4;
+			read += match;
+			pos += match;
+		}
+		else
+		{
+			/* read is left behind, picked up by the absolute packet */
+			pos += 1;
+		}
+	}
+	out_pos = abs_rle(ipix, read, pos, out, out_pos); /* finish any remaining pixels */
+	/* end of line */
+	out[out_pos+0] = 0;
+	out[out_pos+1] = 0;
+	return out_pos + 2;
+}
+
+static PyObject *
+row_rle(PyObject *self, PyObject *args)
+{
+	Py_buffer cur, prev, outb;
+	PyObject *prev_obj;
+	Py_ssize_t out_pos;
+	Py_ssize_t result;
+	(void)self;
+	if (!PyArg_ParseTuple(args, "y*Ow*n", &cur, &prev_obj, &outb, &out_pos))
+		return NULL;
+	prev.buf = NULL;
+	if (prev_obj != Py_None)
+	{
+		if (PyObject_GetBuffer(prev_obj, &prev, PyBUF_CONTIG_RO) != 0)
+		{
+			PyBuffer_Release(&cur);
+			PyBuffer_Release(&outb);
+			return NULL;
+		}
+		if (prev.len != cur.len)
+		{
+			PyBuffer_Release(&cur);
+			PyBuffer_Release(&prev);
+			PyBuffer_Release(&outb);
+			PyErr_SetString(PyExc_ValueError, "previous row length mismatch");
+			return NULL;
+		}
+	}
+	if (out_pos < 0 || (out_pos + (cur.len / 4) * 4 + 8) > outb.len)
+	{
+		PyBuffer_Release(&cur);
+		if (prev.buf != NULL) PyBuffer_Release(&prev);
+		PyBuffer_Release(&outb);
+		PyErr_SetString(PyExc_ValueError, "output buffer too small");
+		return NULL;
+	}
+	result = row_rle_c((const uint32_t *)cur.buf,
+	                   (const uint32_t *)prev.buf,
+	                   cur.len / 4,
+	                   (uint8_t *)outb.buf, out_pos);
+	PyBuffer_Release(&cur);
+	if (prev.buf != NULL) PyBuffer_Release(&prev);
+	PyBuffer_Release(&outb);
+	return PyLong_FromSsize_t(result);
+}
+
+static PyMethodDef methods[] = {
+	{"row_rle", row_rle, METH_VARARGS,
+	 "row_rle(cur, prev, out, out_pos)\n"
+	 "Encodes one packed uint32 row (prev may be None) into out, returns new out_pos."},
+	{NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+	PyModuleDef_HEAD_INIT, "_easyavi_rle",
+	"Compiled MSRLE24 row encoder for easyavi.", -1, methods,
+	NULL, NULL, NULL, NULL
+};
+
+PyMODINIT_FUNC
+PyInit__easyavi_rle(void)
+{
+	return PyModule_Create(&module);
+}
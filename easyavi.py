@@ -16,7 +16,12 @@
 # a.write(frame1)
 # a.write(frame2)
 # ...
-# a.close()
+# a.close() # must be called to finish the file
+#
+# The writer can also be used as a context manager, which closes automatically:
+#
+# with easyavi.open("example.avi", 640, 480, 30) as a:
+#     a.write(frame0)
 #
 # easyavi.series() will instead create a series of AVI files with a 3 digit suffix,
 # splitting automatically when the each file approaches a split length.
@@ -31,6 +36,23 @@
 #
 #  Tested with PIL 5.4.1
 #
+#  If numpy is installed it will be used to accelerate encoding.
+#  Without numpy a slower pure-Python fallback is used.
+#  Callers that already have numpy (height,width,3) uint8 arrays can use
+#  write_array(arr) instead of write() to skip the PIL round trip entirely.
+#
+#  RLE encoding is fastest with the optional _easyavi_rle C extension
+#  (python setup.py build_ext --inplace), or with numba installed;
+#  either compiles the encoder inner loop to native code.
+#
+#  The pillow-simd fork of PIL is a drop-in replacement whose SSE4/AVX2 builds
+#  speed up the mode conversion used by the fallback paths (pip install pillow-simd).
+#  A warning is given if neither numpy nor pillow-simd is available.
+#
+#  open()/series() with parameter async_io=True sends frame data to disk from a
+#  background thread, so write() does not block on a slow drive. Frames are
+#  copied into a bounded queue; close() waits for everything to reach disk.
+#
 #  AVI is uncompressed RGB. File size will be large.
 #  open() with rle=True will use RLE encoding, which can be much smaller, but is slower.
 #
@@ -45,11 +67,134 @@ assert sys.version_info[0] == 3, "Python 3 required."
 import PIL.Image
 import struct
 import builtins
+import warnings
+import mmap
+import queue
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None # optional, accelerates encoding
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None # optional, JIT compiles the RLE inner loop
+
+try:
+    import _easyavi_rle # optional compiled RLE encoder, built by setup.py
+except ImportError:
+    _easyavi_rle = None
+
+# pillow-simd reports versions like "9.0.0.post1"
+PILLOW_SIMD = "post" in getattr(PIL, "__version__", "")
+if (numpy is None) and not PILLOW_SIMD:
+    warnings.warn("easyavi: neither numpy nor pillow-simd is installed, encoding will be slow")
+
+# precompiled pack formats, avoids re-parsing format strings on hot paths
+_U32 = struct.Struct("<L")
+_AVIH = struct.Struct("<LLLL")
+_AVIH2 = struct.Struct("<LLLLLLLLL")
+_STRH = struct.Struct("<LHHLLLL")
+_STRH2 = struct.Struct("<LlLHHHH")
+_STRF = struct.Struct("<LllHHLLllLL")
+_IDX1 = struct.Struct("<4sLLL")
+
+def _abs_rle_nb(ipix,read,pos,out,out_pos):
+    # emits absolute packets for pixels read..pos of a packed row, returns new out_pos
+    while read < pos:
+        abslen = pos - read
+        if abslen < 3:
+            p = ipix[read]
+            out[out_pos] = 1
+            out[out_pos+1] = p & 0xFF
+            out[out_pos+2] = (p >> 8) & 0xFF
+            out[out_pos+3] = (p >> 16) & 0xFF
+            out_pos += 4
+            read += 1
+        else:
+            if abslen > 255:
+                abslen = 255
+            out[out_pos] = 0
+            out[out_pos+1] = abslen
+            out_pos += 2
+            target = read + abslen
+            while read < target:
+                p = ipix[read]
+                out[out_pos] = p & 0xFF
+                out[out_pos+1] = (p >> 8) & 0xFF
+                out[out_pos+2] = (p >> 16) & 0xFF
+                out_pos += 3
+                read += 1
+    return out_pos
+
+def _row_rle_nb(ipix,ppix,has_prev,out,out_pos):
+    # same encoding as EasyAvi.row_rle, restated as plain integer loops over
+    # packed uint32 rows so numba can compile it to native code
+    w = ipix.shape[0]
+    read = 0 # pixels already encoded
+    pos = 0 # pixels currently investigated
+    while pos < w:
+        # count consecutive delta pixels
+        match = 0
+        if has_prev:
+            i = pos
+            while i < w and ipix[i] == ppix[i]:
+                i += 1
+            match = i - pos
+        # count consecutive matching pixels
+        p = ipix[pos]
+        run = 1
+        i = pos + 1
+        while i < w and ipix[i] == p:
+            run += 1
+            i += 1
+        if run > 255:
+            run = 255
+        # decide whether to emit a match, run, or collect raw bytes for absolute encoding
+        if (run > match) and (run > 1):
+            out_pos = _abs_rle_nb(ipix,read,pos,out,out_pos)
+            out[out_pos] = run
+            out[out_pos+1] = p & 0xFF
+            out[out_pos+2] = (p >> 8) & 0xFF
+            out[out_pos+3] = (p >> 16) & 0xFF
+            out_pos += 4
+            read = pos + run
+            pos += run
+        elif match > 1:
+            out_pos = _abs_rle_nb(ipix,read,pos,out,out_pos)
+            read = pos
+            if (pos + match) >= w:
+                break # immediate end of line
+            if match > 255:
+                match = 255
+            out[out_pos] = 0
+            out[out_pos+1] = 2 # skip command
+            out[out_pos+2] = match # X skip
+            out[out_pos+3] = 0 # Y skip
+            out_pos += 4
+            read += match
+            pos += match
+        else:
+            # read is left behind, will be picked up by the absolute packet
+            pos += 1
+    out_pos = _abs_rle_nb(ipix,read,pos,out,out_pos) # finish any remaining pixels
+    # end of line
+    out[out_pos] = 0
+    out[out_pos+1] = 0
+    return out_pos + 2
+
+if njit is not None:
+    _abs_rle_nb = njit(cache=True,boundscheck=False)(_abs_rle_nb)
+    _row_rle_nb = njit(cache=True,boundscheck=False)(_row_rle_nb)
 
 class EasyAvi:
 
     KEYFRAME_TIME = 10 # seconds per keyframe in RLE mode
     SERIES_SPLIT = (4*(1<<30)) - (64*(1<<20)) # when to split series (leaves some room for last frame)
+    # idx1 entry layout, kept identical to the file format so the table can be written directly
+    IDX1_DTYPE = None if numpy is None else numpy.dtype([("fcc","S4"),("flags","<u4"),("pos","<u4"),("size","<u4")])
 
     def write_fcc(self,name):
         assert(len(name)==4)
@@ -57,19 +202,27 @@ class EasyAvi:
 
     def make_fixup(self):
         pos = self.f.tell()
-        self.f.write(struct.pack("<L",0)) # placeholder
+        self.f.write(_U32.pack(0)) # placeholder
         return pos
 
     def push_riff(self,fcc):
         self.write_fcc(fcc)
         self.riff_fixup.append(self.make_fixup())
 
+    def fixup_u32(self,pos,value):
+        # patches an already-written u32; fields in the mapped header region
+        # become memory stores instead of a seek/write/seek round trip
+        if (self.hdr_mmap is not None) and ((pos + 4) <= self.hdr_size):
+            _U32.pack_into(self.hdr_mmap,pos,value)
+        else:
+            self.f.seek(pos,0)
+            self.f.write(_U32.pack(value))
+            self.f.seek(0,2) # return to end
+
     def pop_riff(self):
         fixup = self.riff_fixup.pop()
         chunk_size = self.f.tell() - (fixup + 4)
-        self.f.seek(fixup,0)
-        self.f.write(struct.pack("<L",chunk_size))
-        self.f.seek(0,2) # return to end
+        self.fixup_u32(fixup,chunk_size)
 
     def write_prefix(self):
         assert(self.opened)
@@ -84,13 +237,13 @@ class EasyAvi:
         self.write_fcc("hdrl")
         # avih chunk (main AVI header)
         self.push_riff("avih")
-        self.f.write(struct.pack("<LLLL",
+        self.f.write(_AVIH.pack(
             1000000//self.fps, # us/frame
             frame_size * self.fps, # max bytes per second
             0, # padding
             0x10)) # flags (AVIF_HASINDEX)
         self.frames_fixup.append(self.make_fixup())
-        self.f.write(struct.pack("<LLLLLLLLL",
+        self.f.write(_AVIH2.pack(
             0, # initial frames (audio delay)
             1, # number of streams
             frame_size, # bytes per frame
@@ -105,7 +258,7 @@ class EasyAvi:
         self.push_riff("strh")
         self.write_fcc("vids")
         self.write_fcc("RLE " if self.rle else "MSVC")
-        self.f.write(struct.pack("<LHHLLLL",
+        self.f.write(_STRH.pack(
             0, # flags
             0, # priority
             0, # language
@@ -114,7 +267,7 @@ class EasyAvi:
             self.fps, # rate divisor
             0)) # start
         self.frames_fixup.append(self.make_fixup())
-        self.f.write(struct.pack("<LlLHHHH",
+        self.f.write(_STRH2.pack(
             frame_size + frame_extra, # suggested chunk buffer size
             -1, # quality
             0, # sample size
@@ -122,7 +275,7 @@ class EasyAvi:
         self.pop_riff()
         # strf chunk (stream format, BITMAPINFOHEADER)
         self.push_riff("strf")
-        self.f.write(struct.pack("<LllHHLLllLL",
+        self.f.write(_STRF.pack(
             40, # size of structure
             self.w,
             self.h,
@@ -150,72 +303,115 @@ class EasyAvi:
         self.pop_riff()
         # idx1 chunk
         self.push_riff("idx1")
-        assert(len(self.indices) == self.frames)
-        for idx in self.indices:
-            self.write_fcc(idx[0])
-            self.f.write(struct.pack("<LLL",idx[1],idx[2],idx[3]))
+        if numpy is not None:
+            self.f.write(self.indices[:self.frames].tobytes()) # layout matches the file format
+        else:
+            assert(len(self.indices) == self.frames)
+            buf = bytearray(16 * self.frames)
+            for i,idx in enumerate(self.indices):
+                _IDX1.pack_into(buf,i*16,idx[0].encode("ASCII"),idx[1],idx[2],idx[3])
+            self.f.write(buf)
         self.pop_riff()
-        self.indices = []
+        self.indices = None
         # close RIFF AVI list
         self.pop_riff()
         assert(len(self.riff_fixup) == 0) # returned to top level
         # fix up frame count
-        for pos in self.frames_fixup:
-            self.f.seek(pos,0)
-            self.f.write(struct.pack("<L",self.frames))
-        self.f.seek(0,2) # return to end
-        self.frames_fixup = []       
+        if self.hdr_mmap is not None:
+            for pos in self.frames_fixup:
+                _U32.pack_into(self.hdr_mmap,pos,self.frames) # memory stores, no seeking
+        elif len(self.frames_fixup) > 0:
+            # the fields sit close together in the header, so patch them with a
+            # single read-modify-write instead of one seek/write pair per field
+            lo = min(self.frames_fixup)
+            hi = max(self.frames_fixup)
+            self.f.seek(lo,0)
+            span = bytearray(self.f.read((hi - lo) + 4))
+            for pos in self.frames_fixup:
+                _U32.pack_into(span,pos - lo,self.frames)
+            self.f.seek(lo,0)
+            self.f.write(span)
+            self.f.seek(0,2) # return to end
+        self.frames_fixup = []
+
+    def add_index(self,fcc,fccb,flags,size):
+        if numpy is not None:
+            if self.frames >= len(self.indices): # grow geometrically
+                self.indices = numpy.resize(self.indices,len(self.indices)*2)
+            self.indices[self.frames] = (fccb, flags, self.index_pos, size)
+        else:
+            self.indices.append((fcc, flags, self.index_pos, size))
+        self.index_pos += size + 8
 
     def write_frame_chunk(self,fcc,flags,data):
-        self.write_fcc(fcc)
-        self.f.write(struct.pack("<L",len(data)))
-        self.f.write(data)
-        index = (fcc, flags, self.index_pos, len(data))
-        self.index_pos += len(data) + 8
-        return index
+        fccb = fcc.encode("ASCII")
+        assert(len(fccb)==4)
+        hdr = fccb + _U32.pack(len(data))
+        if self.ioq is not None:
+            self.ioq.put(hdr + bytes(data)) # copied, the encode buffers are reused
+            self.wpos += len(hdr) + len(data)
+        else:
+            self.f.write(hdr) # header in one write
+            self.f.write(data)
+        self.add_index(fcc,fccb,flags,len(data))
 
     # uncompressed BGR24 encoder
 
+    def write_frame_raw_array(self,bgr):
+        # bgr is a contiguous bottom-up (h,w,3) uint8 array; pixels are copied
+        # straight into the preallocated chunk buffer (chunk header and row
+        # padding already in place) and dispatched with a single write
+        assert(self.opened)
+        self.frame_view[...] = bgr.reshape(self.h,self.w * 3)
+        if self.ioq is not None:
+            self.ioq.put(bytes(self.frame_buf)) # copied, the chunk buffer is reused
+            self.wpos += len(self.frame_buf)
+        else:
+            self.f.write(self.frame_buf)
+        self.add_index("00db",b"00db",0x10,self.stride * self.h)
+
     def write_frame_raw(self,img):
-        stride = img.width * 3
-        if stride & 3: # pad each line to 4 byte boundary
-            stride += 4 - (stride & 3)
-        bgr = img.tobytes("raw","BGR", stride, -1)
+        if numpy is not None:
+            # flip and swap channels in one indexed copy, much faster than PIL's mode conversion
+            return self.write_frame_raw_array(EasyAvi.to_bgr(img))
+        # stride and chunk header are fixed per file, precomputed in __init__
         assert(self.opened)
-        return self.write_frame_chunk("00db",0x10,bgr)
+        bgr = img.tobytes("raw","BGR", self.stride, -1)
+        if self.ioq is not None:
+            self.ioq.put(self.raw_hdr + bgr)
+            self.wpos += len(self.raw_hdr) + len(bgr)
+        else:
+            self.f.write(self.raw_hdr)
+            self.f.write(bgr)
+        self.add_index("00db",b"00db",0x10,self.stride * self.h)
 
     # compressed MSRLE24 encoder
 
-    def pixel_to_bgr(pixel):
-        return [pixel[2],pixel[1],pixel[0]]
-    
-    def row_rle(ipixel,ppixel,w,y):
-        data = []
+    def row_rle(ipixel,ppixel,w,y,ibgr,out,opos):
+        # ibgr is the image as raw top-down BGR bytes, used to copy pixel data
+        # directly into the preallocated out buffer; returns the new write offset
         read = y * w # pixels already encoded
         pos = read # pixels currently investigated
         end = pos + w
         # generate absolute packet to catch up to position
         def emit_absolute():
-            nonlocal pos, read, ipixel, data
-            abslen = pos - read
-            if abslen < 1:
-                return
-            if abslen < 3:
-                while read < pos:
-                    data.append(1)
-                    data += EasyAvi.pixel_to_bgr(ipixel[read])
-                    read += 1
-                return
-            abslen = min(abslen,255)
-            data.append(0)
-            data.append(abslen)
-            target = read + abslen
-            while read < target:
-                data += EasyAvi.pixel_to_bgr(ipixel[read])
-                read += 1
+            nonlocal pos, read, opos
+            while (pos - read) >= 3: # packets of up to 255 pixels
+                abslen = min(pos - read,255)
+                out[opos] = 0
+                out[opos+1] = abslen
+                opos += 2
+                target = read + abslen
+                out[opos:opos+(abslen*3)] = ibgr[read*3:target*3]
+                opos += abslen * 3
+                read = target
             #if (abslen & 1): RLE8 pads to word, but not RLE24, apparently?
-            #    data.append(0)
-            emit_absolute() # recurse, in case it was more than 255
+            #    out[opos] = 0; opos += 1
+            while read < pos: # 1 or 2 remaining pixels become length-1 runs
+                out[opos] = 1
+                out[opos+1:opos+4] = ibgr[read*3:read*3+3]
+                opos += 4
+                read += 1
         # scan through row and encode
         while (pos < end):
             # count consecutive delta pixels
@@ -236,8 +432,9 @@ class EasyAvi:
             # decide whether to emit a match, run, or collect raw bytes for absolute encoding
             if (run > match) and (run > 1):
                 emit_absolute()
-                data.append(run)
-                data += EasyAvi.pixel_to_bgr(ipixel[pos])
+                out[opos] = run
+                out[opos+1:opos+4] = ibgr[pos*3:pos*3+3]
+                opos += 4
                 read += run
                 pos += run
             elif match > 1:
@@ -245,10 +442,11 @@ class EasyAvi:
                 if (pos + match) >= end:
                     break # immediate end of line
                 match = min(match,255)
-                data.append(0)
-                data.append(2) # skip command
-                data.append(match) # X skip
-                data.append(0) # Y skip
+                out[opos] = 0
+                out[opos+1] = 2 # skip command
+                out[opos+2] = match # X skip
+                out[opos+3] = 0 # Y skip
+                opos += 4
                 read += match
                 pos += match
             else:
@@ -256,70 +454,282 @@ class EasyAvi:
                 pos += 1
         emit_absolute() # finish any remaining pixels
         # end of line
-        data.append(0)
-        data.append(0)
-        return data
+        out[opos] = 0
+        out[opos+1] = 0
+        return opos + 2
         # Note: this could be a bit more optimal (e.g. multiple empty lines
         # could be encoded with a single skip entry) but this relaxed implementation
         # already gets the bulk of the potential compression. If optimal size is needed,
         # better to just re-encode later with a superior lossless codec (e.g. ZMBV, Lagarith).
 
+    def to_bgr(img):
+        # converts image to a contiguous bottom-up uint8 array of BGR pixels
+        rgb = numpy.asarray(img if img.mode == "RGB" else img.convert("RGB"), dtype=numpy.uint8)
+        return numpy.ascontiguousarray(rgb[::-1,:,::-1]) # flip rows, swap channels
+
+    def pack_bgr(bgr):
+        # packs a bottom-up BGR array into pixels as B | (G<<8) | (R<<16),
+        # so numpy comparisons operate on whole pixels at once
+        return ( bgr[...,0].astype(numpy.uint32)
+               | (bgr[...,1].astype(numpy.uint32) << 8)
+               | (bgr[...,2].astype(numpy.uint32) << 16))
+
+    def row_rle_packed(iprow,pprow,ibgr,out,opos):
+        # same encoding as row_rle, but run/delta boundaries are found with numpy
+        # so the Python loop only visits boundaries instead of every pixel;
+        # returns the new write offset into the preallocated out buffer
+        w = len(iprow)
+        runstop = numpy.flatnonzero(iprow[1:] != iprow[:-1]) + 1 # indices starting a new run
+        deltastop = None if pprow is None else numpy.flatnonzero(iprow != pprow) # indices differing from previous frame
+        read = 0 # pixels already encoded
+        pos = 0 # pixels currently investigated
+        ri = 0 # next unconsumed runstop entry
+        di = 0 # next unconsumed deltastop entry
+        # generate absolute packet to catch up to position
+        def emit_absolute():
+            nonlocal pos, read, opos
+            while (pos - read) >= 3: # packets of up to 255 pixels
+                abslen = min(pos - read,255)
+                out[opos] = 0
+                out[opos+1] = abslen
+                opos += 2
+                target = read + abslen
+                out[opos:opos+(abslen*3)] = ibgr[read*3:target*3]
+                opos += abslen * 3
+                read = target
+            while read < pos: # 1 or 2 remaining pixels become length-1 runs
+                out[opos] = 1
+                out[opos+1:opos+4] = ibgr[read*3:read*3+3]
+                opos += 4
+                read += 1
+        # scan through row and encode
+        while (pos < w):
+            # count consecutive delta pixels
+            match = 0
+            if deltastop is not None:
+                while di < len(deltastop) and deltastop[di] < pos:
+                    di += 1
+                match = (deltastop[di] if di < len(deltastop) else w) - pos
+            # count consecutive matching pixels
+            while ri < len(runstop) and runstop[ri] <= pos:
+                ri += 1
+            run = (runstop[ri] if ri < len(runstop) else w) - pos
+            run = min(run,255)
+            # decide whether to emit a match, run, or collect raw bytes for absolute encoding
+            if (run > match) and (run > 1):
+                emit_absolute()
+                out[opos] = run
+                out[opos+1:opos+4] = ibgr[pos*3:pos*3+3]
+                opos += 4
+                read += run
+                pos += run
+            elif match > 1:
+                emit_absolute()
+                if (pos + match) >= w:
+                    break # immediate end of line
+                match = min(match,255)
+                out[opos] = 0
+                out[opos+1] = 2 # skip command
+                out[opos+2] = match # X skip
+                out[opos+3] = 0 # Y skip
+                opos += 4
+                read += match
+                pos += match
+            else:
+                # read is left behind, will be pickedup by emit_absolute
+                pos += 1
+        emit_absolute() # finish any remaining pixels
+        # end of line
+        out[opos] = 0
+        out[opos+1] = 0
+        return opos + 2
+
+    def write_frame_rle_array(self,bgr):
+        # bgr is a contiguous bottom-up (h,w,3) uint8 array
+        previous = self.previous_packed
+        if previous is None or (self.frames % self.keyrate) == 0:
+            previous = None
+            fcc = "00db"
+            flags = 0x10 # AVIIF_KEYFRAME
+        else:
+            fcc = "00dc"
+            flags = 0
+        w = self.w
+        out = self.rle_buf # preallocated worst-case output buffer
+        out_pos = 0
+        packed = EasyAvi.pack_bgr(bgr)
+        # rows identical to the previous frame are skipped with a bare end of line
+        if previous is None:
+            row_diff = None
+        elif (w & 1) == 0:
+            # compare two pixels per lane by viewing the packed rows as uint64
+            row_diff = numpy.any(packed.view(numpy.uint64) != previous.view(numpy.uint64),axis=1)
+        else:
+            row_diff = numpy.any(packed != previous,axis=1)
+        if (row_diff is not None) and not row_diff.any():
+            out[0] = 0 # nothing changed, becomes a bare end of bitmap below
+            out[1] = 0
+            out_pos = 2
+        elif _easyavi_rle is not None:
+            # C compiled encoder
+            for y in range(self.h):
+                if (row_diff is not None) and not row_diff[y]:
+                    out[out_pos] = 0 # unchanged row, end of line only
+                    out[out_pos+1] = 0
+                    out_pos += 2
+                    continue
+                out_pos = _easyavi_rle.row_rle(packed[y],
+                    None if previous is None else previous[y],out,out_pos)
+        elif njit is not None:
+            # numba compiled encoder
+            pprows = packed if (previous is None) else previous
+            for y in range(self.h):
+                if (row_diff is not None) and not row_diff[y]:
+                    out[out_pos] = 0 # unchanged row, end of line only
+                    out[out_pos+1] = 0
+                    out_pos += 2
+                    continue
+                out_pos = _row_rle_nb(packed[y],pprows[y],previous is not None,out,out_pos)
+        else:
+            ibgr = memoryview(bgr.reshape(-1).data) # raw BGR bytes for copying into packets
+            for y in range(self.h):
+                if (row_diff is not None) and not row_diff[y]:
+                    out[out_pos] = 0 # unchanged row, end of line only
+                    out[out_pos+1] = 0
+                    out_pos += 2
+                    continue
+                out_pos = EasyAvi.row_rle_packed(packed[y],
+                    None if previous is None else previous[y],
+                    ibgr[y*w*3:(y+1)*w*3], out, out_pos)
+        out[out_pos-1] = 1 # remove last end of line, replace with end of bitmap
+        while (out_pos & 3): # pad to 4 byte boundary
+            out[out_pos] = 0
+            out_pos += 1
+        data = memoryview(out)[0:out_pos] # written before the buffer is reused
+        self.previous_packed = packed # retained for delta comparison, freshly built each frame
+        return self.write_frame_chunk(fcc,flags,data)
+
     def write_frame_rle(self,img): # MSRLE 24
-        if self.previous == None or (self.frames % self.keyrate) == 0:
+        if numpy is not None:
+            return self.write_frame_rle_array(EasyAvi.to_bgr(img))
+        previous = self.previous
+        if previous == None or (self.frames % self.keyrate) == 0:
             previous = None
             fcc = "00db"
             flags = 0x10 # AVIIF_KEYFRAME
         else:
-            previous = self.previous
             fcc = "00dc"
             flags = 0
-        data = []
+        w = img.width
+        out = self.rle_buf # preallocated worst-case output buffer
+        out_pos = 0
         imgdata = img.getdata()
         previousdata = None if (previous == None) else previous.getdata()
+        ibgr = img.tobytes("raw","BGR",0,1) # raw BGR bytes for copying into packets
         for y in range(img.height,0,-1):
-            data += EasyAvi.row_rle(imgdata,previousdata,img.width,y-1)
-        data = data[0:-2] + [0,1] # remove last end of line, replace with end of bitmap
-        # pad to 4 byte boundary
-        while (len(data) & 3):
-            data.append(0)
+            out_pos = EasyAvi.row_rle(imgdata,previousdata,w,y-1,ibgr,out,out_pos)
+        out[out_pos-1] = 1 # remove last end of line, replace with end of bitmap
+        while (out_pos & 3): # pad to 4 byte boundary
+            out[out_pos] = 0
+            out_pos += 1
+        data = memoryview(out)[0:out_pos] # written before the buffer is reused
         # retain last image for delta comparison
         if self.previous == None:
             self.previous = img.copy()
         else:
             self.previous.paste(img)
-        return self.write_frame_chunk(fcc,flags,bytes(data))
+        return self.write_frame_chunk(fcc,flags,data)
 
     # constructor/destructor
 
-    def __init__(self, w, h, fps, rle, series_prefix=None):
+    def __init__(self, w, h, fps, rle, series_prefix=None, async_io=False):
         self.w = w
         self.h = h
         self.fps = fps
         self.rle = rle
         self.f = None
         self.opened = False
+        self.hdr_mmap = None
+        self.async_io = async_io
+        self.ioq = None
+        self.io_thread = None
         self.series_prefix = series_prefix
         self.series_count = 0
+        self.stride = (w * 3) + ((-(w * 3)) & 3) # rows padded to 4 byte boundary
+        if rle:
+            # worst case RLE output: 4 bytes per pixel, 2 per end of line, end of bitmap, padding
+            size = (w * h * 4) + (h * 2) + 8
+            self.rle_buf = numpy.empty(size,numpy.uint8) if numpy is not None else bytearray(size)
+            self.frame_buf = None
+        else:
+            self.rle_buf = None
+            if numpy is not None:
+                # reusable raw frame chunk: 8 byte header followed by the pixel rows,
+                # the header and the zero row padding never change after this
+                self.frame_buf = bytearray(8 + (self.stride * h))
+                self.frame_buf[0:4] = b"00db"
+                _U32.pack_into(self.frame_buf,4,self.stride * h)
+                self.frame_view = numpy.frombuffer(self.frame_buf,numpy.uint8,
+                    offset=8).reshape(h,self.stride)[:,:w*3] # view excluding the padding
+            else:
+                self.frame_buf = None
+                self.raw_hdr = b"00db" + _U32.pack(self.stride * h) # raw chunk header never varies
 
     def __del__(self):
+        # close() is deliberately not called here: finalizing a large file at
+        # arbitrary garbage collection time can stall other threads
+        if self.opened:
+            warnings.warn("easyavi: file dropped without close(), output is incomplete")
+
+    # context manager, equivalent to calling close() when the with block ends
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
         self.close()
 
     # public interface
 
     def open(self,filename):
         """Opens a new AVI file."""
-        self.f = builtins.open(filename,"wb")
+        # a large buffer coalesces the many small header/chunk writes into few syscalls
+        self.f = builtins.open(filename,"w+b",4*1024*1024)
         self.opened = True
         self.frames = 0
         self.riff_fixup = []
         self.frames_fixup = []
-        self.indices = []
+        self.indices = [] if numpy is None else numpy.empty(1024,EasyAvi.IDX1_DTYPE)
         self.index_pos = 0
         self.previous = None
+        self.previous_packed = None
         self.keyrate = self.fps * EasyAvi.KEYFRAME_TIME
+        self.hdr_mmap = None
+        self.hdr_size = 0
         self.write_prefix()
+        # map the written header region so later fixups are just memory stores
+        try:
+            self.f.flush() # header must reach the file before mapping it
+            self.hdr_size = self.f.tell()
+            self.hdr_mmap = mmap.mmap(self.f.fileno(),self.hdr_size,access=mmap.ACCESS_WRITE)
+        except (OSError, ValueError):
+            self.hdr_mmap = None # unsupported platform or filesystem, seek instead
+        if self.async_io:
+            # frame chunks are written by a background thread, overlapping
+            # encoding with disk I/O; bounded queue in case the disk stalls
+            self.wpos = self.f.tell()
+            self.ioq = queue.Queue(16)
+            self.io_thread = threading.Thread(target=self.io_worker,daemon=True)
+            self.io_thread.start()
         return self
 
+    def io_worker(self):
+        while True:
+            data = self.ioq.get()
+            if data is None:
+                break
+            self.f.write(data)
+
     def open_series(self):
         """Opens next file in AVI series."""
         assert(self.series_prefix != None)
@@ -330,17 +740,37 @@ class EasyAvi:
 
     def size(self):
         """File size if closed now."""
-        return self.f.tell() + 8 + (16 * len(self.indices))
+        pos = self.wpos if self.ioq is not None else self.f.tell()
+        return pos + 8 + (16 * self.frames)
 
     def write(self,img):
         """Writes a PIL.Image as the next frame. Returns current file length."""
         assert(img.width==self.w)
         assert(img.height==self.h)
         if not self.rle:
-            index = self.write_frame_raw(img)
+            self.write_frame_raw(img)
+        else:
+            self.write_frame_rle(img)
+        self.frames += 1
+        size = self.size()
+        if (self.series_prefix != None) and (size > EasyAvi.SERIES_SPLIT):
+            self.open_series()
+            return self.size()
+        else:
+            return size
+
+    def write_array(self,arr,order="RGB"):
+        """Writes a numpy (height,width,3) uint8 array as the next frame, without PIL. Returns current file length."""
+        assert(numpy is not None) # requires numpy
+        assert(order in ("RGB","BGR"))
+        arr = numpy.asarray(arr,dtype=numpy.uint8)
+        assert(arr.shape == (self.h,self.w,3))
+        # flip rows, and swap channels if needed, in one contiguous copy
+        bgr = numpy.ascontiguousarray(arr[::-1,:,::-1] if order == "RGB" else arr[::-1])
+        if not self.rle:
+            self.write_frame_raw_array(bgr)
         else:
-            index = self.write_frame_rle(img)
-        self.indices.append(index)
+            self.write_frame_rle_array(bgr)
         self.frames += 1
         size = self.size()
         if (self.series_prefix != None) and (size > EasyAvi.SERIES_SPLIT):
@@ -352,14 +782,23 @@ class EasyAvi:
     def close(self):
         """Finishes writing to disk and closes AVI file."""
         if (self.opened):
+            if self.io_thread is not None:
+                # finish all queued frame writes before the suffix
+                self.ioq.put(None)
+                self.io_thread.join()
+                self.ioq = None
+                self.io_thread = None
             self.write_suffix()
+            if self.hdr_mmap is not None:
+                self.hdr_mmap.close()
+                self.hdr_mmap = None
             self.f.close()
             self.opened = False
 
-def open(filename, w, h, fps, rle=False):
+def open(filename, w, h, fps, rle=False, async_io=False):
     """Opens an AVI file for writing."""
-    return EasyAvi(w,h,fps,rle).open(filename)
+    return EasyAvi(w,h,fps,rle,async_io=async_io).open(filename)
 
-def series(filename_prefix, w, h, fps, rle=False):
+def series(filename_prefix, w, h, fps, rle=False, async_io=False):
     """Opens a series of AVI files prefix###.avi for writing."""
-    return EasyAvi(w,h,fps,rle,filename_prefix).open_series()
+    return EasyAvi(w,h,fps,rle,filename_prefix,async_io).open_series()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+#
+# Builds the optional _easyavi_rle C extension, which accelerates RLE
+# encoding when numba is not available:
+#
+#   python setup.py build_ext --inplace
+#
+# easyavi.py works without it (and without this setup).
+
+from setuptools import setup, Extension
+
+setup(
+    name="easyavi",
+    version="3",
+    py_modules=["easyavi"],
+    ext_modules=[Extension("_easyavi_rle",["_easyavi_rle.c"])],
+)